@@ -1,15 +1,44 @@
+import html
+import os
 import bcrypt
 import streamlit as st
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, Time, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, Time, ForeignKey, Index, select, update, delete, event, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import scoped_session, sessionmaker, relationship, joinedload
 from datetime import date, time
+from string import Template
 
 # Setting up the SQLAlchemy engine and session
-engine = create_engine('sqlite:///turf_booking.db')  # Using SQLite for simplicity
-Session = sessionmaker(bind=engine)
-session = Session()
+@st.cache_resource
+def _get_engine():
+    # Streamlit re-executes this script on every interaction; cache_resource keeps one engine
+    # (and its connection pool) for the whole server instead of building one per rerun
+    engine = create_engine(
+        'sqlite:///turf_booking.db',  # Using SQLite for simplicity
+        connect_args={"check_same_thread": False},  # Streamlit reruns scripts on different threads
+        pool_size=8,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a booking is being written
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+    # Create tables; create_all skips tables that already exist, so add any missing
+    # indexes to older databases too. Done here so it runs once, not on every rerun.
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    return engine
 
 # Base class for declarative models
 Base = declarative_base()
@@ -33,25 +62,61 @@ class Slot(Base):
     date = Column(Date, nullable=False)
     availability = Column(Boolean, default=True)
 
+    __table_args__ = (Index('ix_slot_date_avail', 'date', 'availability'),)
+
 # Define the Booking model
 class Booking(Base):
     __tablename__ = 'bookings'
     booking_id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
-    slot_id = Column(Integer, ForeignKey('slots.slot_id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False, index=True)
+    slot_id = Column(Integer, ForeignKey('slots.slot_id'), nullable=False, index=True)
     confirmation_status = Column(Boolean, default=True)
 
     user = relationship('User')
     slot = relationship('Slot')
 
-# Create tables
-Base.metadata.create_all(engine)
+engine = _get_engine()
+
+# Each Streamlit script thread gets its own session; `session` proxies to the current thread's one
+Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+session = Session
+
+# Slots are always one hour long, so every "HH:MM to HH:MM" label can be built once up front
+_HOUR_LABELS = {hour: f"{hour:02d}:00 to {(hour + 1) % 24:02d}:00" for hour in range(24)}
+
+# Explicit bcrypt cost; stored hashes carry their own cost, so raising this only affects new ones
+BCRYPT_ROUNDS = 12
+# Set to "argon2" to hash new passwords with argon2id (requires argon2-cffi)
+PASSWORD_HASHER = os.environ.get("TURF_PASSWORD_HASHER", "bcrypt")
+# Reject a bad setting at startup rather than on the first registration
+if PASSWORD_HASHER not in ("bcrypt", "argon2"):
+    raise ValueError(f"TURF_PASSWORD_HASHER must be 'bcrypt' or 'argon2', got {PASSWORD_HASHER!r}")
+if PASSWORD_HASHER == "argon2":
+    try:
+        import argon2  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("TURF_PASSWORD_HASHER=argon2 requires the argon2-cffi package") from exc
 
 # Helper functions
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    if PASSWORD_HASHER == "argon2":
+        from argon2 import PasswordHasher
+        return PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2).hash(password)
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def check_password(password, hashed):
+    # The hash prefix identifies the algorithm, so bcrypt and argon2 users can coexist
+    if hashed.startswith("$argon2"):
+        try:
+            from argon2 import PasswordHasher
+            from argon2.exceptions import InvalidHash, VerificationError
+        except ImportError:
+            # argon2-cffi was uninstalled after argon2 hashes were stored; reject instead of crashing
+            return False
+        try:
+            return PasswordHasher().verify(hashed, password)
+        except (InvalidHash, VerificationError):
+            return False
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def register_user(name, email, phone, password, role):
@@ -72,42 +137,92 @@ def authenticate_user(email, password):
     return None
 
 def generate_slots_for_date(selected_date):
-    if not session.query(Slot).filter(Slot.date == selected_date).first():
-        for hour in range(24):
-            session.add(Slot(
-                start_time=time(hour, 0), 
-                end_time=time((hour + 1) % 24, 0), 
-                date=selected_date
-            ))
+    if not session.query(session.query(Slot).filter(Slot.date == selected_date).exists()).scalar():
+        rows = [
+            {"start_time": time(hour, 0), "end_time": time((hour + 1) % 24, 0), "date": selected_date, "availability": True}
+            for hour in range(24)
+        ]
+        session.bulk_insert_mappings(Slot, rows)
         session.commit()
 
+def get_slots_for_date(selected_date):
+    # A plain select rather than lambda_stmt: Streamlit re-declares the models on every rerun,
+    # and a cached lambda statement would keep returning the first run's Slot class
+    stmt = select(Slot).where(Slot.date == selected_date).order_by(Slot.start_time)
+    return session.execute(stmt).scalars().all()
+
 def get_available_slots(selected_date):
-    generate_slots_for_date(selected_date)
-    return session.query(Slot).filter(Slot.date == selected_date).all()
+    # Slots usually exist already, so fetch first and only generate them on a miss
+    slots = get_slots_for_date(selected_date)
+    if not slots:
+        generate_slots_for_date(selected_date)
+        slots = get_slots_for_date(selected_date)
+    return slots
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_available(selected_date):
+    # Plain tuples so reruns reuse the result without touching the database
+    return [(slot.slot_id, slot.start_time, slot.end_time, slot.availability) for slot in get_available_slots(selected_date)]
 
 def book_slot(user_id, slot_ids):
-    successful_bookings = []
-    for slot_id in slot_ids:
-        slot = session.query(Slot).filter(Slot.slot_id == slot_id, Slot.availability == True).first()
-        if slot:
-            slot.availability = False
-            booking = Booking(user_id=user_id, slot_id=slot_id)
-            session.add(booking)
-            successful_bookings.append(slot)
-    session.commit()
+    if not isinstance(user_id, int):
+        raise TypeError(f"user_id must be an int, got {type(user_id).__name__}")
+    # Duplicate or empty selections (e.g. a double-clicked "Book Now") never reach the database
+    slot_ids = list(set(slot_ids))
+    if not slot_ids:
+        return []
+    # Claim every still-available slot in one UPDATE so two sessions cannot book the same slot
+    try:
+        claimed_ids = session.execute(
+            update(Slot)
+            .where(Slot.slot_id.in_(slot_ids), Slot.availability == True)
+            .values(availability=False)
+            .returning(Slot.slot_id)
+        ).scalars().all()
+        session.bulk_insert_mappings(Booking, [{"user_id": user_id, "slot_id": slot_id} for slot_id in claimed_ids])
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _cached_available.clear()
+    successful_bookings = session.query(Slot).filter(Slot.slot_id.in_(claimed_ids)).all()
+    user = session.get(User, user_id)
     for slot in successful_bookings:
-        user = session.query(User).filter(User.user_id == user_id).first()
         send_notification(user, slot)
     return successful_bookings
 
 def cancel_booking(booking_id):
-    booking = session.query(Booking).filter_by(booking_id=booking_id).first()
-    if booking:
-        booking.slot.availability = True
-        session.delete(booking)
+    try:
+        slot_id = session.execute(
+            delete(Booking).where(Booking.booking_id == booking_id).returning(Booking.slot_id)
+        ).scalar()
+        if slot_id is None:
+            session.rollback()
+            return False
+        session.execute(update(Slot).where(Slot.slot_id == slot_id).values(availability=True))
         session.commit()
-        return True
-    return False
+    except Exception:
+        session.rollback()
+        raise
+    _cached_available.clear()
+    return True
+
+def get_booking_rows(*criteria, page=0, items_per_page=3):
+    # Read-only views only need a few columns, so skip hydrating Booking/Slot/User objects
+    stmt = (
+        select(Booking.booking_id, Slot.date, Slot.start_time, Slot.end_time, User.name)
+        .join(Slot, Booking.slot_id == Slot.slot_id)
+        .join(User, Booking.user_id == User.user_id)
+        .where(*criteria)
+        .order_by(Booking.booking_id.desc())
+        .limit(items_per_page)
+        .offset(page * items_per_page)
+    )
+    return session.execute(stmt).mappings().all()
+
+def count_bookings(*criteria):
+    stmt = select(func.count(Booking.booking_id)).join(Slot, Booking.slot_id == Slot.slot_id).where(*criteria)
+    return session.execute(stmt).scalar()
 
 def send_notification(user, slot):
     user_message = f"Hello {user.name},\nYour booking is confirmed for {slot.date} from {slot.start_time} to {slot.end_time}.\nThank you!"
@@ -117,27 +232,30 @@ def send_notification(user, slot):
     st.write(f"Email sent to {user.email}: {user_message}")
     st.write(f"Email sent to owner@example.com: {owner_message}")
 
-def render_bookings_as_cards(bookings, page, items_per_page=3):
-    start = page * items_per_page
-    end = start + items_per_page
-    bookings_on_page = bookings[start:end]
-
-    col1, col2, col3 = st.columns(3)
-    columns = [col1, col2, col3]
-
-    for i, booking in enumerate(bookings_on_page):
-        with columns[i % 3]:
-            st.markdown(
-                f"""
-                <div style="border: 1px solid #ddd; border-radius: 8px; padding: 10px; margin-bottom: 10px;">
-                    <h4 style="color: #4CAF50;">Booking ID: {booking.booking_id}</h4>
-                    <p><strong>Date:</strong> {booking.slot.date}</p>
-                    <p><strong>Time:</strong> {booking.slot.start_time.strftime('%H:%M')} to {booking.slot.end_time.strftime('%H:%M')}</p>
-                    <p><strong>User:</strong> {booking.user.name}</p>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+# Card markup is compiled once; a page of cards is rendered as a single markdown element
+_BOOKING_CARD = Template(
+    '<div style="border: 1px solid #ddd; border-radius: 8px; padding: 10px; margin-bottom: 10px;">'
+    '<h4 style="color: #4CAF50;">Booking ID: $booking_id</h4>'
+    '<p><strong>Date:</strong> $date</p>'
+    '<p><strong>Time:</strong> $time</p>'
+    '<p><strong>User:</strong> $name</p>'
+    '</div>'
+)
+
+def render_bookings_as_cards(bookings_on_page):
+    cards = "".join(
+        _BOOKING_CARD.substitute(
+            booking_id=row['booking_id'],
+            date=html.escape(str(row['date'])),
+            time=_HOUR_LABELS[row['start_time'].hour],
+            name=html.escape(row['name']),  # one bad name must not break the whole page's markup
+        )
+        for row in bookings_on_page
+    )
+    st.markdown(
+        f'<div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem;">{cards}</div>',
+        unsafe_allow_html=True
+    )
 
 # Streamlit App
 st.set_page_config(page_title="TURF Booking System", page_icon=":soccer:")
@@ -186,203 +304,210 @@ st.markdown(
 
 st.title("TURF Booking System :soccer:")
 
-# Sidebar for authentication
-with st.sidebar:
-    if 'user' not in st.session_state:
-        st.session_state.user = None
+try:
+    # Sidebar for authentication
+    with st.sidebar:
+        if 'user' not in st.session_state:
+            st.session_state.user = None
 
-    if st.session_state.user is None:
-        st.header("Welcome to TURF Booking")
-
-        # Use buttons instead of radio buttons
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            if st.button("Login"):
-                st.session_state.auth_action = "Login"
-        with col2:
-            if st.button("Sign Up"):
-                st.session_state.auth_action = "Register"
-        with col3:
-            if st.button("Sign in with Google",type="primary"):
-                st.session_state.auth_action = "Google"
-
-        if 'auth_action' in st.session_state:
-            if st.session_state.auth_action == "Login":
-                # Show login fields
-                email = st.text_input("Email", key="login_email")
-                password = st.text_input("Password", type="password", key="login_password")
+        if st.session_state.user is None:
+            st.header("Welcome to TURF Booking")
+
+            # Use buttons instead of radio buttons
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("Login"):
+                    st.session_state.auth_action = "Login"
+            with col2:
+                if st.button("Sign Up"):
+                    st.session_state.auth_action = "Register"
+            with col3:
+                if st.button("Sign in with Google",type="primary"):
+                    st.session_state.auth_action = "Google"
+
+            if 'auth_action' in st.session_state:
+                if st.session_state.auth_action == "Login":
+                    # Show login fields
+                    email = st.text_input("Email", key="login_email")
+                    password = st.text_input("Password", type="password", key="login_password")
                 
-                if st.button("Login Now"):
-                    # Validate inputs
-                    if not email or not password:
-                        st.error("Email and password are required!")
-                    else:
-                        user = authenticate_user(email, password)
-                        if user:
-                            st.session_state.user = user
-                            st.success(f"Welcome, {user.name}!")
+                    if st.button("Login Now"):
+                        # Validate inputs
+                        if not email or not password:
+                            st.error("Email and password are required!")
                         else:
-                            st.error("Invalid email or password.")
-
-            elif st.session_state.auth_action == "Register":
-                # Show registration fields
-                role = st.radio("Register as", ["User", "Owner"])
-                name = st.text_input("Name", key="register_name")
-                email = st.text_input("Email", key="register_email")
-                phone = st.text_input("Phone", key="register_phone")
-                password = st.text_input("Password", type="password", key="register_password")
+                            user = authenticate_user(email, password)
+                            if user:
+                                st.session_state.user = user
+                                st.success(f"Welcome, {user.name}!")
+                            else:
+                                st.error("Invalid email or password.")
+
+                elif st.session_state.auth_action == "Register":
+                    # Show registration fields
+                    role = st.radio("Register as", ["User", "Owner"])
+                    name = st.text_input("Name", key="register_name")
+                    email = st.text_input("Email", key="register_email")
+                    phone = st.text_input("Phone", key="register_phone")
+                    password = st.text_input("Password", type="password", key="register_password")
                 
-                if st.button("Register Now"):
-                    # Validate inputs
-                    if not name or not email or not phone or not password:
-                        st.error("All fields are required!")
-                    elif len(password) < 6:
-                        st.error("Password must be at least 6 characters long.")
-                    else:
-                        if register_user(name, email, phone, password, role.lower()):
-                            st.success("Registration successful! Please log in.")
+                    if st.button("Register Now"):
+                        # Validate inputs
+                        if not name or not email or not phone or not password:
+                            st.error("All fields are required!")
+                        elif len(password) < 6:
+                            st.error("Password must be at least 6 characters long.")
                         else:
-                            st.error("Registration failed. Email might already be in use.")
-
-            elif st.session_state.auth_action == "Google":
-                # Simulate Google Sign-In
-                st.button("Sign in with Google", help="Google Sign-In is not implemented in this example.", 
-                          key="google_signin", on_click=lambda: st.info("Google Sign-In is not implemented in this example."),
-                          style="google-btn")
-                st.markdown("""
-                    <button class="google-btn">
-                        <img class="google-logo" src="https://www.gstatic.com/images/branding/product/1x/gsa_48dp.png" width="20"/>
-                        Sign in with Google
-                    </button>
-                    """, unsafe_allow_html=True)
-
-    else:
-        if st.button("Logout"):
-            st.session_state.user = None
-            st.success("Logged out successfully.")
-
-# Main Content Area (Right Side)
-if st.session_state.user is None:
-    # Display welcome content
-    st.write("## Welcome to the TURF Booking System")
-    st.write("Easily manage your turf bookings with our user-friendly system.")
-    st.image("https://lh3.googleusercontent.com/p/AF1QipPGvhDAFOx-gW6IbfKuZx3mbRXmlQVhfJyPThQN=s1360-w1360-h1020", caption="Turf Location")
-    st.write("### Features:")
-    st.write("- Easy booking and cancellation")
-    st.write("- Real-time slot availability")
-    st.write("- Manage bookings efficiently")
-    st.image("https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcTM6fYuTm2-aOOpqldtBbhcce-o1SZGVD2u1w&s", width=100, caption="Join our community")
-
-# Main Dashboard Logic
-if st.session_state.user:
-    user = st.session_state.user
-    st.header(f"Welcome, {user.name} :wave:")
-
-    if user.role == "user":
-        st.subheader("User Dashboard")
-        choice = st.selectbox("What would you like to do?", ["Book a Slot", "Cancel Booking", "List Bookings", "Get Turf Details"])
-
-        if choice == "Book a Slot":
-            selected_date = st.date_input("Select a Date", value=date.today())
-            slots = get_available_slots(selected_date)
+                            if register_user(name, email, phone, password, role.lower()):
+                                st.success("Registration successful! Please log in.")
+                            else:
+                                st.error("Registration failed. Email might already be in use.")
+
+                elif st.session_state.auth_action == "Google":
+                    # Simulate Google Sign-In
+                    st.button("Sign in with Google", help="Google Sign-In is not implemented in this example.", 
+                              key="google_signin", on_click=lambda: st.info("Google Sign-In is not implemented in this example."),
+                              style="google-btn")
+                    st.markdown("""
+                        <button class="google-btn">
+                            <img class="google-logo" src="https://www.gstatic.com/images/branding/product/1x/gsa_48dp.png" width="20"/>
+                            Sign in with Google
+                        </button>
+                        """, unsafe_allow_html=True)
+
+        else:
+            if st.button("Logout"):
+                st.session_state.user = None
+                st.success("Logged out successfully.")
+
+    # Main Content Area (Right Side)
+    if st.session_state.user is None:
+        # Display welcome content
+        st.write("## Welcome to the TURF Booking System")
+        st.write("Easily manage your turf bookings with our user-friendly system.")
+        st.image("https://lh3.googleusercontent.com/p/AF1QipPGvhDAFOx-gW6IbfKuZx3mbRXmlQVhfJyPThQN=s1360-w1360-h1020", caption="Turf Location")
+        st.write("### Features:")
+        st.write("- Easy booking and cancellation")
+        st.write("- Real-time slot availability")
+        st.write("- Manage bookings efficiently")
+        st.image("https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcTM6fYuTm2-aOOpqldtBbhcce-o1SZGVD2u1w&s", width=100, caption="Join our community")
+
+    # Main Dashboard Logic
+    if st.session_state.user:
+        user = st.session_state.user
+        st.header(f"Welcome, {user.name} :wave:")
+
+        if user.role == "user":
+            st.subheader("User Dashboard")
+            choice = st.selectbox("What would you like to do?", ["Book a Slot", "Cancel Booking", "List Bookings", "Get Turf Details"])
+
+            if choice == "Book a Slot":
+                selected_date = st.date_input("Select a Date", value=date.today())
+                slots = _cached_available(selected_date)
             
-            # Filter only available slots
-            available_slots = [slot for slot in slots if slot.availability]
-            slot_options = [f"{slot.start_time.strftime('%H:%M')} to {slot.end_time.strftime('%H:%M')}" for slot in available_slots]
-            slot_ids = [slot.slot_id for slot in available_slots]
-
-            if slot_options:
-                # Using multiselect for available slots
-                selected_slots = st.multiselect(
-                    "Select Slots",
-                    options=slot_options
-                )
-
-                if st.button("Book Now"):
-                    selected_slot_indices = [slot_options.index(slot) for slot in selected_slots]
-                    selected_slot_ids = [slot_ids[i] for i in selected_slot_indices]
-                    booked_slots = book_slot(user.user_id, selected_slot_ids)
-                    if booked_slots:
-                        st.success(f"Booking confirmed for {len(booked_slots)} slot(s)!")
-                    else:
-                        st.error("One or more selected slots are already booked. Please choose other slots.")
-            else:
-                st.info("No available slots for the selected date. Please choose another date.")
-
-        elif choice == "Cancel Booking":
-            bookings = session.query(Booking).filter_by(user_id=user.user_id).all()
-            if bookings:
-                booking_options = [f"Booking ID: {booking.booking_id}, Date: {booking.slot.date}, Time: {booking.slot.start_time.strftime('%H:%M')} to {booking.slot.end_time.strftime('%H:%M')}" for booking in bookings]
-                selected_booking_index = st.selectbox("Select a Booking to Cancel", range(len(booking_options)), format_func=lambda x: booking_options[x])
-                selected_booking = bookings[selected_booking_index]
-
-                if st.button("Cancel Booking"):
-                    if cancel_booking(selected_booking.booking_id):
-                        st.success("Booking cancelled successfully.")
+                # Filter only available slots
+                label_to_id = {_HOUR_LABELS[start_time.hour]: slot_id for slot_id, start_time, _, availability in slots if availability}
+
+                if label_to_id:
+                    # Using multiselect for available slots
+                    selected_slots = st.multiselect(
+                        "Select Slots",
+                        options=list(label_to_id.keys())
+                    )
+
+                    if st.button("Book Now"):
+                        selected_slot_ids = [label_to_id[label] for label in selected_slots]
+                        if not selected_slot_ids:
+                            st.warning("Please select at least one slot.")
+                        else:
+                            booked_slots = book_slot(user.user_id, selected_slot_ids)
+                            if booked_slots:
+                                st.success(f"Booking confirmed for {len(booked_slots)} slot(s)!")
+                            else:
+                                st.error("One or more selected slots are already booked. Please choose other slots.")
+                else:
+                    st.info("No available slots for the selected date. Please choose another date.")
+
+            elif choice == "Cancel Booking":
+                bookings = session.query(Booking).options(joinedload(Booking.slot)).filter_by(user_id=user.user_id).all()
+                if bookings:
+                    booking_by_label = {f"Booking ID: {booking.booking_id}, Date: {booking.slot.date}, Time: {_HOUR_LABELS[booking.slot.start_time.hour]}": booking for booking in bookings}
+                    selected_label = st.selectbox("Select a Booking to Cancel", list(booking_by_label))
+                    selected_booking = booking_by_label[selected_label]
+
+                    if st.button("Cancel Booking"):
+                        if cancel_booking(selected_booking.booking_id):
+                            st.success("Booking cancelled successfully.")
+                        else:
+                            st.error("Failed to cancel booking.")
+                else:
+                    st.info("You have no bookings to cancel.")
+
+            elif choice == "List Bookings":
+                total_bookings = count_bookings(Booking.user_id == user.user_id)
+                if total_bookings:
+                    st.write("Your Bookings:")
+                    items_per_page = 3
+                    total_pages = (total_bookings - 1) // items_per_page + 1
+                    page = st.number_input("Page", min_value=1, max_value=total_pages, step=1) - 1
+                    render_bookings_as_cards(get_booking_rows(Booking.user_id == user.user_id, page=page, items_per_page=items_per_page))
+                else:
+                    st.info("No bookings found.")
+
+            elif choice == "Get Turf Details":
+                st.write("Turf Details:")
+                st.image("https://example.com/turf_image.jpg", caption="Turf Location")
+                st.write("Location: XYZ Sports Complex")
+                st.write("Size: 100x50 meters")
+                st.write("Surface: Artificial Grass")
+
+        elif user.role == "owner":
+            st.subheader("Owner Dashboard")
+            choice = st.selectbox("What would you like to do?", ["Create Slot", "Block Slot", "Check Bookings"])
+
+            if choice == "Create Slot":
+                selected_date = st.date_input("Select a Date", value=date.today())
+                start_hour = st.number_input("Start Hour", min_value=0, max_value=23, value=0)
+                end_hour = (start_hour + 1) % 24
+
+                if st.button("Create Slot"):
+                    slot_exists = session.query(Slot).filter(Slot.date == selected_date, Slot.start_time == time(start_hour, 0)).first()
+                    if not slot_exists:
+                        session.add(Slot(start_time=time(start_hour, 0), end_time=time(end_hour, 0), date=selected_date))
+                        session.commit()
+                        _cached_available.clear()
+                        st.success("Slot created successfully.")
                     else:
-                        st.error("Failed to cancel booking.")
-            else:
-                st.info("You have no bookings to cancel.")
-
-        elif choice == "List Bookings":
-            bookings = session.query(Booking).filter_by(user_id=user.user_id).all()
-            if bookings:
-                st.write("Your Bookings:")
-                items_per_page = 3
-                total_pages = (len(bookings) - 1) // items_per_page + 1
-                page = st.number_input("Page", min_value=1, max_value=total_pages, step=1) - 1
-                render_bookings_as_cards(bookings, page, items_per_page)
-            else:
-                st.info("No bookings found.")
-
-        elif choice == "Get Turf Details":
-            st.write("Turf Details:")
-            st.image("https://example.com/turf_image.jpg", caption="Turf Location")
-            st.write("Location: XYZ Sports Complex")
-            st.write("Size: 100x50 meters")
-            st.write("Surface: Artificial Grass")
-
-    elif user.role == "owner":
-        st.subheader("Owner Dashboard")
-        choice = st.selectbox("What would you like to do?", ["Create Slot", "Block Slot", "Check Bookings"])
-
-        if choice == "Create Slot":
-            selected_date = st.date_input("Select a Date", value=date.today())
-            start_hour = st.number_input("Start Hour", min_value=0, max_value=23, value=0)
-            end_hour = (start_hour + 1) % 24
-
-            if st.button("Create Slot"):
-                slot_exists = session.query(Slot).filter(Slot.date == selected_date, Slot.start_time == time(start_hour, 0)).first()
-                if not slot_exists:
-                    session.add(Slot(start_time=time(start_hour, 0), end_time=time(end_hour, 0), date=selected_date))
-                    session.commit()
-                    st.success("Slot created successfully.")
+                        st.warning("Slot already exists.")
+
+            elif choice == "Block Slot":
+                selected_date = st.date_input("Select a Date", value=date.today())
+                slots = get_slots_for_date(selected_date)
+                if slots:
+                    slot_by_label = {f"Slot ID: {slot.slot_id}, Time: {_HOUR_LABELS[slot.start_time.hour]}": slot for slot in slots}
+                    selected_label = st.selectbox("Select a Slot to Block", list(slot_by_label))
+                    selected_slot = slot_by_label[selected_label]
+
+                    if st.button("Block Slot"):
+                        selected_slot.availability = False
+                        session.commit()
+                        _cached_available.clear()
+                        st.success("Slot blocked successfully.")
+                else:
+                    st.info("No slots found for the selected date.")
+
+            elif choice == "Check Bookings":
+                selected_date = st.date_input("Select a Date", value=date.today())
+                total_bookings = count_bookings(Slot.date == selected_date)
+                if total_bookings:
+                    st.write("Bookings for the Day:")
+                    items_per_page = 3
+                    total_pages = (total_bookings - 1) // items_per_page + 1
+                    page = st.number_input("Page", min_value=1, max_value=total_pages, step=1) - 1
+                    render_bookings_as_cards(get_booking_rows(Slot.date == selected_date, page=page, items_per_page=items_per_page))
                 else:
-                    st.warning("Slot already exists.")
-
-        elif choice == "Block Slot":
-            selected_date = st.date_input("Select a Date", value=date.today())
-            slots = session.query(Slot).filter(Slot.date == selected_date).all()
-            if slots:
-                slot_options = [f"Slot ID: {slot.slot_id}, Time: {slot.start_time.strftime('%H:%M')} to {slot.end_time.strftime('%H:%M')}" for slot in slots]
-                selected_slot_index = st.selectbox("Select a Slot to Block", range(len(slot_options)), format_func=lambda x: slot_options[x])
-                selected_slot = slots[selected_slot_index]
-
-                if st.button("Block Slot"):
-                    selected_slot.availability = False
-                    session.commit()
-                    st.success("Slot blocked successfully.")
-            else:
-                st.info("No slots found for the selected date.")
-
-        elif choice == "Check Bookings":
-            selected_date = st.date_input("Select a Date", value=date.today())
-            bookings = session.query(Booking).join(Slot).filter(Slot.date == selected_date).all()
-            if bookings:
-                st.write("Bookings for the Day:")
-                items_per_page = 3
-                total_pages = (len(bookings) - 1) // items_per_page + 1
-                page = st.number_input("Page", min_value=1, max_value=total_pages, step=1) - 1
-                render_bookings_as_cards(bookings, page, items_per_page)
-            else:
-                st.info("No bookings found for the selected date.")
+                    st.info("No bookings found for the selected date.")
+finally:
+    # Release this run's session and connection back to the pool, even if the run raised
+    # or was interrupted by a rerun
+    Session.remove()